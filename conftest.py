@@ -0,0 +1 @@
+# Makes json_replace importable from the tests when pytest is run from the repository root.
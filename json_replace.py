@@ -8,30 +8,142 @@ and to restore the original values after checkout.
 """
 
 import argparse
+import hashlib
 import json
-import glob
+import math
+import mmap
+import os
+import pickle
+import re
+import stat
 import sys
-from typing import Dict, List, Any, Optional, Union, Tuple
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import IntEnum
+from typing import (Callable, Dict, FrozenSet, Iterable, Iterator, List, Any, NamedTuple, Optional, Pattern,
+                    Sequence, Set, Union, Tuple)
+import orjson
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader  # type: ignore[assignment]
+
+_MAGIC_CHECK = re.compile(r'[*?[]')
+
+# Whether paths are compared ignoring case (on Windows), like glob does through fnmatch
+_IGNORE_CASE = os.path.normcase('A') == 'a'
+
+# (parents, leaf, expected, replacement) of a key configuration, see compile_keys
+CompiledKey = Tuple[Tuple[str, ...], str, Any, Any]
+
+# Replaces the expected values of fixed groups of keys in a JSON object and returns the
+# index of the last group that replaced a value, or None, see compile_replacer
+Replacer = Callable[[Dict[str, Any]], Optional[int]]
+
+# Matches one path component: None for '**', a literal name, or a compiled wildcard part
+PartMatcher = Union[str, Pattern[str], None]
+
+# Marks a key missing from a JSON object, as None is a valid JSON value
+_MISSING = object()
+
+
+class Direction(IntEnum):
+    """Direction of replacement."""
+
+    TO_COMMITTED = 0
+    TO_WORKING = 1
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def parse(cls, value: str) -> 'Direction':
+        """Parse a direction from its command line spelling.
+
+        Args:
+            value: Either 'to_committed' or 'to_working'.
+
+        Returns:
+            The matching direction.
+
+        Raises:
+            ValueError: If the value does not name a direction.
+        """
+        try:
+            return cls[value.upper()]
+        except KeyError:
+            raise ValueError(f"invalid direction: '{value}'") from None
+
+
+# (expected, replacement) field names of a key configuration, indexed by Direction
+_DIRECTION_FIELDS = (('working', 'committed'), ('committed', 'working'))
+
+# Spellings in indented orjson output that json.dumps may write differently: a number in
+# exponent notation or a float below 1e-4 in positional notation, anchored to where number
+# tokens start (after ': ' or the indentation), or an unescaped U+007F. Rare matches inside
+# strings only cost a fallback to json.
+_ORJSON_MISMATCH = re.compile(rb'(?m)(?:: |^ *)-?(?:[0-9][0-9.]*[eE]|0\.0000)|\x7f')
+
+# Number of matched files processed in the calling thread before starting a thread pool
+_SERIAL_FILES = 64
+
+# Files at least this large are memory-mapped rather than read into memory
+_MMAP_THRESHOLD = 256 * 1024
+
+
+def _direction_arg(value: str) -> Direction:
+    """Parse the --direction argument, see Direction.parse.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value does not name a direction.
+    """
+    try:
+        return Direction.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
 
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments.
 
     Returns:
         argparse.Namespace: The parsed command line arguments.
-            Contains 'direction' (str) and 'config' (str) attributes.
+            Contains 'direction' (Direction), 'config' (str) and 'filenames' (List[str]) attributes.
     """
     parser = argparse.ArgumentParser(description='Replace values in JSON files')
-    parser.add_argument('--direction', choices=['to_committed', 'to_working'],
+    parser.add_argument('--direction', type=_direction_arg, choices=list(Direction),
                         required=True, help='Direction of replacement')
     parser.add_argument('--config', required=True, help='Path to config file')
+    parser.add_argument('filenames', nargs='*',
+                        help='Files to process (e.g. staged files passed by pre-commit); all matching files if omitted')
     return parser.parse_args()
 
 
+def _config_cache_path(config_path: str) -> str:
+    """Return the path under which the parsed configuration is cached.
+
+    Args:
+        config_path: Path to the YAML configuration file.
+
+    Returns:
+        Path of the pickle file in the user's cache directory. Each configuration
+        file has a single entry, which is overwritten whenever the file changes.
+    """
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    key = os.path.abspath(config_path).encode('utf-8')
+    digest = hashlib.blake2b(key, digest_size=16).hexdigest()
+    return os.path.join(cache_dir, 'json-replace', f'{digest}.pkl')
+
+
 def load_config(config_path: str) -> Dict[str, Any]:
     """Load configuration from YAML file.
 
+    The parsed configuration is cached on disk together with a hash of the file's
+    contents, so that unchanged configurations are not parsed again on every hook
+    invocation.
+
     Args:
         config_path: Path to the YAML configuration file.
 
@@ -43,36 +155,564 @@ def load_config(config_path: str) -> Dict[str, Any]:
         yaml.YAMLError: If the configuration file is not valid YAML.
     """
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        with open(config_path, 'rb') as f:
+            contents = f.read()
     except FileNotFoundError:
         print(f"Error: Configuration file '{config_path}' not found")
         sys.exit(1)
+
+    digest = hashlib.blake2b(contents, digest_size=16).digest()
+    cache_path = _config_cache_path(config_path)
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_digest, config = pickle.load(f)
+        if cached_digest == digest:
+            return config
+    except Exception:
+        # Missing, unreadable or outdated cache entries are simply rebuilt below
+        pass
+
+    try:
+        config = yaml.load(contents.decode('utf-8'), Loader=_YamlLoader)
     except yaml.YAMLError as e:
         print(f"Error: Invalid YAML in configuration file '{config_path}': {e}")
         sys.exit(1)
 
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        _write_atomic(cache_path, pickle.dumps((digest, config)), 0o600)
+    except OSError:
+        pass
+    return config
+
+
+def _read_contents(file_path: str, size: int) -> Union[bytes, mmap.mmap]:
+    """Read the raw contents of a file.
+
+    Files of at least _MMAP_THRESHOLD bytes are memory-mapped instead of copied into
+    a bytes object; the caller must close the returned mmap.
+
+    Args:
+        file_path: Path to the file to read.
+        size: Size of the file in bytes.
+
+    Returns:
+        The contents of the file, as bytes or a read-only mmap.
+    """
+    with open(file_path, 'rb') as f:
+        if size < _MMAP_THRESHOLD:
+            return f.read()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _same_contents(raw: Union[bytes, mmap.mmap], out: bytes) -> bool:
+    """Check whether serialized output equals the raw contents of a file.
+
+    Args:
+        raw: The raw contents as returned by _read_contents.
+        out: The serialized output.
+
+    Returns:
+        True if the contents are equal to the output.
+    """
+    if len(raw) != len(out):
+        return False
+    with memoryview(raw) as view:
+        return view == out
+
+
+def _loads(raw: Union[bytes, mmap.mmap]) -> Tuple[Any, bool]:
+    """Parse JSON bytes, preferring orjson.
+
+    orjson rejects a few inputs the standard library accepts (NaN, Infinity and
+    integers wider than 64 bits), so those documents are re-parsed with ``json``.
+
+    Args:
+        raw: The raw contents of a JSON file, as returned by _read_contents.
+
+    Returns:
+        Tuple of the parsed JSON document and whether orjson parsed it. Documents
+        orjson rejected must not be serialized with it either, as it would write
+        NaN and Infinity as null.
+
+    Raises:
+        json.JSONDecodeError: If the contents are not valid JSON.
+    """
+    try:
+        with memoryview(raw) as view:
+            return orjson.loads(view), True
+    except orjson.JSONDecodeError:
+        return json.loads(raw if isinstance(raw, bytes) else raw[:]), False
+
+
+def _dumps(data: Any, indent: int, use_orjson: bool = True) -> bytes:
+    """Serialize data the way ``json.dump`` would, using orjson where it gives the same result.
+
+    orjson only supports a two space indentation and differs from ``json`` in a few
+    spellings: it writes non-ASCII characters and U+007F unescaped, and formats
+    floats in a different exponent notation (``1e16`` for ``1e+16``) and at different
+    thresholds (``0.00001`` for ``1e-05``). Its output is only used if it contains
+    none of these, so the result is always byte-identical to ``json.dumps``.
+
+    Args:
+        data: The JSON document to serialize.
+        indent: Number of spaces for indentation.
+        use_orjson: Whether orjson may be used, see _loads.
+
+    Returns:
+        The serialized document.
+    """
+    if use_orjson and indent == 2:
+        try:
+            out = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass
+        else:
+            if out.isascii() and not _ORJSON_MISMATCH.search(out):
+                return out
+    return json.dumps(data, indent=indent).encode('utf-8')
+
+
+def _orjson_safe(value: Any) -> bool:
+    """Check whether orjson serializes a value from the configuration the way ``json`` does.
+
+    YAML has values JSON lacks: orjson writes dates as strings and non-finite floats
+    as null, where ``json`` raises or writes NaN and Infinity.
+
+    Args:
+        value: A replacement value from the configuration.
+
+    Returns:
+        True if the value only consists of strings, finite numbers, booleans, None,
+        lists and objects with string keys.
+    """
+    if type(value) is float:
+        return math.isfinite(value)
+    if value is None or type(value) in (str, int, bool):
+        return True
+    if type(value) is list:
+        return all(_orjson_safe(item) for item in value)
+    if type(value) is dict:
+        return all(type(key) is str and _orjson_safe(item) for key, item in value.items())
+    return False
+
+
+def _write_atomic(file_path: str, contents: bytes, mode: int) -> None:
+    """Replace the contents of a file so that readers never see a partial write.
+
+    The contents are written to a temporary file next to the target (following
+    symlinks), which is then renamed over it.
+
+    Args:
+        file_path: Path to the file to replace.
+        contents: The new contents of the file.
+        mode: The file's st_mode, whose permission bits are kept.
+    """
+    target = os.path.realpath(file_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(target)}.', suffix='.tmp',
+                                    dir=os.path.dirname(target))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contents)
+        os.chmod(tmp_path, stat.S_IMODE(mode))
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _normalize_path(path: str) -> str:
+    """Normalize a relative path or pattern for matching.
+
+    Args:
+        path: Path using '/' or the platform's separator.
+
+    Returns:
+        The path using '/' as the separator, without '.' components and repeated
+        slashes. A leading or trailing '/' is kept, '..' components are not resolved.
+    """
+    path = path.replace(os.sep, '/')
+    parts = [part for part in path.split('/') if part not in ('', '.')]
+    if path.endswith('/') and parts:
+        parts.append('')
+    return ('/' if path.startswith('/') else '') + '/'.join(parts)
+
+
+def _split_pattern(pattern: str) -> Tuple[str, List[str]]:
+    """Split a glob pattern into its literal base directory and the remaining parts.
+
+    Args:
+        pattern: Glob pattern using '/' as the separator.
+
+    Returns:
+        Tuple of the base directory ('' for the current directory) and the list
+        of pattern parts below it, the first of which contains a wildcard.
+    """
+    pattern = _normalize_path(pattern)
+    parts = pattern.split('/')
+    i = 0
+    while i < len(parts) - 1 and not _MAGIC_CHECK.search(parts[i]):
+        i += 1
+    base = '/'.join(parts[:i])
+    if not base and pattern.startswith('/'):
+        base = '/'
+    return base, parts[i:]
+
+
+def _translate_part(part: str) -> str:
+    """Translate one path component of a glob pattern into a regular expression.
+
+    Like glob, wildcards never match a leading '.' unless the part itself starts with one.
+
+    Args:
+        part: A single path component of a glob pattern (not '**').
+
+    Returns:
+        Regular expression matching the component.
+    """
+    res = '' if part.startswith('.') or not _MAGIC_CHECK.search(part) else r'(?!\.)'
+    i, n = 0, len(part)
+    while i < n:
+        c = part[i]
+        i += 1
+        if c == '*':
+            res += '[^/]*'
+        elif c == '?':
+            res += '[^/]'
+        elif c == '[':
+            j = i
+            if j < n and part[j] == '!':
+                j += 1
+            if j < n and part[j] == ']':
+                j += 1
+            while j < n and part[j] != ']':
+                j += 1
+            if j >= n:
+                res += r'\['
+            else:
+                # Escape backslashes and the set operations re reserves (&&, ~~, ||)
+                stuff = re.sub(r'([&~|])', r'\\\1', part[i:j].replace('\\', r'\\'))
+                i = j + 1
+                if stuff[0] == '!':
+                    # Exclude '/' with a lookahead, as inside the set it could close a leading ']'
+                    res += f'(?!/)[^{stuff[1:]}]'
+                    continue
+                if stuff[0] in '^[':
+                    stuff = '\\' + stuff
+                res += f'[{stuff}]'
+        else:
+            res += re.escape(c)
+    return res
+
+
+def _regex_flags() -> int:
+    """Return the flags to compile pattern regular expressions with.
+
+    Returns:
+        re.IGNORECASE if paths are compared ignoring case, 0 otherwise.
+    """
+    return re.IGNORECASE if _IGNORE_CASE else 0
+
+
+def _compile_glob(base: str, parts: List[str]) -> Pattern[str]:
+    """Compile the parts of a glob pattern below base into a regular expression.
+
+    Args:
+        base: Literal base directory of the pattern, as returned by _split_pattern.
+        parts: Remaining pattern parts, as returned by _split_pattern.
+
+    Returns:
+        Compiled regular expression matching full paths of files found below base.
+    """
+    res = ''
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == '**':
+            res += r'(?:(?!\.)[^/]+/)*' + (r'(?!\.)[^/]+' if last else '')
+        else:
+            res += _translate_part(part) + ('' if last else '/')
+    prefix = '' if not base else re.escape(base if base.endswith('/') else base + '/')
+    return re.compile(prefix + res, _regex_flags())
+
+
+def _compile_parts(parts: List[str]) -> List[PartMatcher]:
+    """Compile the parts of a glob pattern for matching path components one at a time.
+
+    Args:
+        parts: Pattern parts, e.g. as returned by _split_pattern.
+
+    Returns:
+        For each part None if it is '**', the part itself if it has no wildcards, and
+        a compiled regular expression otherwise.
+    """
+    return [None if part == '**' else re.compile(_translate_part(part), _regex_flags()) if _MAGIC_CHECK.search(part)
+            else part for part in parts]
+
+
+def _closure(matchers: Dict[int, List[PartMatcher]], states: Iterable[Tuple[int, int]]) -> FrozenSet[Tuple[int, int]]:
+    """Add the states reached by letting '**' parts match no directory at all.
+
+    Args:
+        matchers: Compiled pattern parts by pattern index.
+        states: (pattern index, part position) pairs.
+
+    Returns:
+        The states together with all states following a '**' part in them.
+    """
+    result: Set[Tuple[int, int]] = set()
+    pending = list(states)
+    while pending:
+        state = pending.pop()
+        if state in result:
+            continue
+        result.add(state)
+        index, pos = state
+        if matchers[index][pos] is None and pos + 1 < len(matchers[index]):
+            pending.append((index, pos + 1))
+    return frozenset(result)
+
+
+def _list_dir(directory: str, states: FrozenSet[Tuple[int, int]],
+              matchers: Dict[int, List[PartMatcher]]) -> Iterator[Tuple[str, bool]]:
+    """List the entries of a directory that the given states may match.
+
+    If every state expects a literal name, only those names are looked up, like glob
+    does, instead of listing the whole directory.
+
+    Args:
+        directory: Directory to list ('' for the current directory).
+        states: (pattern index, part position) pairs to match the entries against.
+        matchers: Compiled pattern parts by pattern index.
+
+    Yields:
+        Tuples of the name of each file or directory and whether it is a directory.
+    """
+    literals = {matchers[index][pos] for index, pos in states}
+    if all(type(literal) is str for literal in literals):
+        for name in literals:
+            try:
+                mode = os.stat(os.path.join(directory, name)).st_mode
+            except (OSError, ValueError):
+                continue
+            if stat.S_ISDIR(mode) or stat.S_ISREG(mode):
+                yield name, stat.S_ISDIR(mode)
+        return
+
+    try:
+        entries = os.scandir(directory or '.')
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    yield entry.name, True
+                elif entry.is_file():
+                    yield entry.name, False
+            except OSError:
+                continue
+
+
+def _walk_matches(top: str, matchers: Dict[int, List[PartMatcher]]) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+    """Yield the files below a directory that match any of the given patterns.
+
+    Every pattern is followed part by part while descending, so a directory is only
+    entered if some pattern can still match below it, and hidden names and depth are
+    limited per pattern rather than for the whole walk.
+
+    Args:
+        top: Directory to walk ('' for the current directory).
+        matchers: Compiled parts of the patterns relative to top (see _compile_parts), by pattern index.
+
+    Yields:
+        Tuples of a file path, prefixed with top, and the sorted indices of the patterns matching it.
+    """
+    stack = [(top, _closure(matchers, ((index, 0) for index in matchers)))]
+    while stack:
+        directory, states = stack.pop()
+        prefix = '' if not directory else directory if directory.endswith('/') else directory + '/'
+        for name, is_dir in _list_dir(directory, states, matchers):
+            advanced: Set[Tuple[int, int]] = set()
+            matched: Set[int] = set()
+            for index, pos in states:
+                matcher = matchers[index][pos]
+                last = pos == len(matchers[index]) - 1
+                if matcher is None:
+                    # Like glob, '**' never matches hidden names
+                    if name.startswith('.'):
+                        continue
+                    if is_dir:
+                        advanced.add((index, pos))
+                    elif last:
+                        matched.add(index)
+                elif (matcher == name or _IGNORE_CASE and os.path.normcase(matcher) == os.path.normcase(name)
+                      if type(matcher) is str else matcher.fullmatch(name)):
+                    if not last:
+                        if is_dir:
+                            advanced.add((index, pos + 1))
+                    elif not is_dir:
+                        matched.add(index)
+            if advanced:
+                stack.append((prefix + name, _closure(matchers, advanced)))
+            elif matched:
+                yield prefix + name, tuple(sorted(matched))
+
+
+def _relative_parts(base: str, root: str) -> Optional[List[str]]:
+    """Return the path components leading from root to base.
+
+    Args:
+        base: Literal base directory of a pattern.
+        root: Directory that may contain base.
 
-def find_json_files(pattern: str) -> List[str]:
+    Returns:
+        The components of base below root, or None if walking root does not reach base.
+    """
+    root_parts = root.rstrip('/').split('/') if root else []
+    base_parts = base.rstrip('/').split('/') if base else []
+    rest = base_parts[len(root_parts):]
+    if base_parts[:len(root_parts)] != root_parts or any(part in ('', '.', '..') for part in rest):
+        return None
+    return rest
+
+
+def find_json_files(pattern: str) -> Iterator[str]:
     """Find JSON files matching the given pattern.
 
+    The pattern is matched while walking the tree below its literal base directory
+    with os.scandir, only entering directories the pattern can still match.
+
     Args:
         pattern: Glob pattern to match JSON files.
 
     Returns:
-        List of paths to matching JSON files.
+        Iterator over paths to matching JSON files.
     """
-    return glob.glob(pattern, recursive=True)
+    base, parts = _split_pattern(pattern)
+    return (path for path, _ in _walk_matches(base, {0: _compile_parts(parts)}))
 
 
-def replace_in_json(file_path: str, keys: List[Dict[str, str]], direction: str, indent: int = 2) -> bool:
-    """Replace values in a JSON file according to the direction.
+def compile_keys(keys: List[Dict[str, Any]], direction: Union[Direction, str]) -> List[CompiledKey]:
+    """Prepare key configurations for repeated use on many files.
 
     Args:
-        file_path: Path to the JSON file to modify.
         keys: List of key configurations, each containing 'key', 'working', and 'committed' values.
-        direction: Direction of replacement, either 'to_committed' or 'to_working'.
-        indent: Number of spaces for indentation in the output JSON file.
+        direction: Direction of replacement, or its command line spelling ('to_committed' or 'to_working').
+
+    Returns:
+        List of (parents, leaf, expected, replacement) tuples, where parents are the
+        parts of the dot-separated key leading to the object holding the leaf key, and
+        expected is the value to be replaced by replacement in the given direction.
+
+    Raises:
+        ValueError: If direction is a string that does not name a direction.
+    """
+    if isinstance(direction, str):
+        direction = Direction.parse(direction)
+    src, dst = _DIRECTION_FIELDS[direction]
+    compiled = []
+    for key_config in keys:
+        *parents, leaf = key_config['key'].split('.')
+        compiled.append((tuple(parents), leaf, key_config[src], key_config[dst]))
+    return compiled
+
+
+def compile_prescan(keys: List[CompiledKey]) -> Optional[Tuple[bytes, ...]]:
+    """Collect byte strings at least one of which occurs in every file where a key may be replaced.
+
+    A JSON string without '\\u' or '\\/' escapes has exactly one spelling, the one
+    ``json.dumps`` produces with ``ensure_ascii=False``, so a file containing none of
+    those spellings, their ASCII escaped form, or either escape cannot hold an
+    expected value and does not need to be parsed. The byte strings are searched for
+    one at a time, as a plain substring search is faster than parsing, while a regular
+    expression alternating between them is not.
+
+    Args:
+        keys: List of compiled keys as returned by compile_keys.
+
+    Returns:
+        The byte strings to search the raw file contents for, or None if an expected value
+        is not a string (numbers have several spellings) and every file must be parsed.
+    """
+    literals = {b'\\u', b'\\/'}
+    for _, _, expected, _ in keys:
+        if not isinstance(expected, str):
+            return None
+        literals.add(json.dumps(expected).encode('ascii'))
+        literals.add(json.dumps(expected, ensure_ascii=False).encode('utf-8'))
+    return tuple(sorted(literals))
+
+
+def compile_replacer(groups: List[List[CompiledKey]]) -> Replacer:
+    """Generate a function replacing the values of the given groups of keys in a JSON object.
+
+    The key paths are fixed once the configuration is loaded, so instead of walking
+    them generically for every file, a function with the lookups spelled out is
+    generated for every key, e.g. for the key 'a.b'::
+
+        def replace_0(o):
+            o = o.get('a')
+            if type(o) is not dict:
+                return False
+            value = o.get('b', _MISSING)
+            if value is _MISSING or value != expected_0:
+                return False
+            o['b'] = replacement_0
+            return True
+
+    The generated code stays flat however long the key path is.
+
+    Args:
+        groups: Lists of compiled keys as returned by compile_keys, e.g. one per pattern.
+
+    Returns:
+        Function taking the parsed JSON object, replacing the values in place and
+        returning the index of the last group in which a value was replaced, or
+        None if nothing was replaced.
+    """
+    namespace: Dict[str, Any] = {'_MISSING': _MISSING}
+    keys = [(group, key) for group, group_keys in enumerate(groups) for key in group_keys]
+    lines = []
+    for i, (_, (parents, leaf, expected, replacement)) in enumerate(keys):
+        namespace[f'expected_{i}'] = expected
+        namespace[f'replacement_{i}'] = replacement
+        lines.append(f'def replace_{i}(o):')
+        for part in parents:
+            lines.append(f'    o = o.get({part!r})')
+            lines.append('    if type(o) is not dict:')
+            lines.append('        return False')
+        lines.append(f'    value = o.get({leaf!r}, _MISSING)')
+        lines.append(f'    if value is _MISSING or value != expected_{i}:')
+        lines.append('        return False')
+        lines.append(f'    o[{leaf!r}] = replacement_{i}')
+        lines.append('    return True')
+    lines.extend(['def replace(data):', '    changed = None'])
+    for i, (group, _) in enumerate(keys):
+        lines.append(f'    if replace_{i}(data):')
+        lines.append(f'        changed = {group}')
+    lines.append('    return changed')
+    exec(compile('\n'.join(lines), '<json-replace replacer>', 'exec'), namespace)
+    return namespace['replace']
+
+
+def replace_in_json(file_path: str, replacer: Replacer, indents: Sequence[int] = (2,),
+                    prescan: Optional[Tuple[bytes, ...]] = None, use_orjson: bool = True,
+                    report: Callable[[str], None] = print) -> bool:
+    """Replace values in a JSON file.
+
+    Args:
+        file_path: Path to the JSON file to modify.
+        replacer: Function replacing the values in the parsed document, as returned by compile_replacer.
+        indents: Number of spaces for indentation in the output JSON file, for each
+            group of keys of the replacer. The file is written with the indentation of
+            the last group that replaced a value.
+        prescan: Optional byte strings as returned by compile_prescan. Files containing
+            none of them are skipped without being parsed.
+        use_orjson: Whether orjson may serialize the replaced values, see _orjson_safe.
+        report: Function called with each message about the file, print by default.
 
     Returns:
         True if the file was modified, False otherwise.
@@ -81,75 +721,255 @@ def replace_in_json(file_path: str, keys: List[Dict[str, str]], direction: str,
         json.JSONDecodeError: If the file is not valid JSON (handled internally).
         FileNotFoundError: If the file is not found (handled internally).
     """
+    raw: Optional[Union[bytes, mmap.mmap]] = None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except json.JSONDecodeError:
-        print(f"Error: {file_path} is not a valid JSON file")
-        return False
-    except FileNotFoundError:
-        print(f"Error: {file_path} not found")
-        return False
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return False
+        try:
+            st = os.stat(file_path)
+            raw = _read_contents(file_path, st.st_size)
+            # find rather than 'in', which an mmap only supports for single bytes
+            if prescan is not None and all(raw.find(literal) == -1 for literal in prescan):
+                return False
+            data, parsed_by_orjson = _loads(raw)
+        except json.JSONDecodeError:
+            report(f"Error: {file_path} is not a valid JSON file")
+            return False
+        except FileNotFoundError:
+            report(f"Error: {file_path} not found")
+            return False
+        except Exception as e:
+            report(f"Error reading {file_path}: {e}")
+            return False
 
-    modified = False
-    for key_config in keys:
-        key_path = key_config['key'].split('.')
-        current = data
-
-        # Navigate to the nested key
-        for i, part in enumerate(key_path):
-            if i == len(key_path) - 1:
-                # We're at the final key
-                if part in current:
-                    if direction == 'to_committed' and current[part] == key_config['working']:
-                        current[part] = key_config['committed']
-                        modified = True
-                    elif direction == 'to_working' and current[part] == key_config['committed']:
-                        current[part] = key_config['working']
-                        modified = True
-            else:
-                # Navigate deeper
-                if part not in current or not isinstance(current[part], dict):
-                    break
-                current = current[part]
+        # JSON parsers only produce plain dicts, so an exact type check suffices
+        if type(data) is not dict:
+            return False
+
+        changed = replacer(data)
+        if changed is None:
+            return False
 
-    if modified:
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=indent)
-            print(f"Modified: {file_path}")
+            out = _dumps(data, indents[changed], use_orjson and parsed_by_orjson)
         except Exception as e:
-            print(f"Error writing to {file_path}: {e}")
+            report(f"Error writing to {file_path}: {e}")
+            return False
+        # Written in binary mode, so translate newlines the way text mode would
+        if os.linesep != '\n':
+            out = out.replace(b'\n', os.linesep.encode('ascii'))
+        if _same_contents(raw, out):
             return False
+    finally:
+        # The mapping has to be gone before the file is replaced (Windows refuses otherwise)
+        if isinstance(raw, mmap.mmap):
+            raw.close()
+
+    try:
+        _write_atomic(file_path, out, st.st_mode)
+        report(f"Modified: {file_path}")
+    except Exception as e:
+        report(f"Error writing to {file_path}: {e}")
+        return False
+
+    return True
+
+
+def _real_path(file_path: str, real_dirs: Dict[str, str]) -> str:
+    """Return the normalized real path of a file, as os.path.realpath would.
 
-    return modified
+    Resolving a path takes a system call per component, so each directory is only
+    resolved once. Only files that are symbolic links themselves are fully resolved.
 
+    Args:
+        file_path: Path of the file.
+        real_dirs: Real paths of the directories resolved so far, updated in place.
+
+    Returns:
+        The real path of the file, normalized with os.path.normcase.
+    """
+    directory, name = os.path.split(file_path)
+    if os.path.islink(file_path):
+        return os.path.normcase(os.path.realpath(file_path))
+    real_dir = real_dirs.get(directory)
+    if real_dir is None:
+        real_dir = real_dirs[directory] = os.path.realpath(directory or os.curdir)
+    return os.path.normcase(os.path.join(real_dir, name))
+
+
+class CompiledPattern(NamedTuple):
+    """A pattern configuration prepared for matching and replacing."""
+
+    base: str
+    parts: List[str]
+    regex: Pattern[str]
+    keys: List[CompiledKey]
+    indent: int
+
+
+def _walk_patterns(patterns: List[CompiledPattern]) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+    """Walk the tree below the base directories of all patterns.
+
+    Every pattern is attached to the shallowest base directory containing its own,
+    so that each directory is walked at most once.
+
+    Args:
+        patterns: The compiled pattern configurations.
+
+    Yields:
+        Tuples of a matching file path and the sorted indices of the patterns matching it.
+    """
+    roots: Dict[str, List[int]] = {}
+    for index in sorted(range(len(patterns)), key=lambda i: len(patterns[i].base)):
+        base = patterns[index].base
+        root = next((root for root in roots if _relative_parts(base, root) is not None), base)
+        roots.setdefault(root, []).append(index)
+
+    for root, indices in roots.items():
+        matchers = {index: _compile_parts((_relative_parts(patterns[index].base, root) or []) + patterns[index].parts)
+                    for index in indices}
+        yield from _walk_matches(root, matchers)
 
-def process_files(config: Dict[str, Any], direction: str) -> int:
+
+def _match_filenames(patterns: List[CompiledPattern], filenames: List[str]) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+    """Match the given files against all patterns.
+
+    The relative and the absolute patterns are each compiled into a single regular
+    expression, so files matching none of them are rejected with one or two matches.
+    Absolute patterns are matched against the absolute path of each file.
+
+    Args:
+        patterns: The compiled pattern configurations.
+        filenames: Paths of the files, relative to the current directory.
+
+    Yields:
+        Tuples of a matching file path and the sorted indices of the patterns matching it.
+    """
+    groups: Dict[bool, List[int]] = {False: [], True: []}
+    for index, pattern in enumerate(patterns):
+        groups[os.path.isabs(pattern.base)].append(index)
+    combined = {is_abs: re.compile('|'.join(f'(?:{patterns[index].regex.pattern})' for index in indices),
+                                   _regex_flags())
+                for is_abs, indices in groups.items() if indices}
+
+    for file_path in dict.fromkeys(_normalize_path(file_path) for file_path in filenames):
+        matched: List[int] = []
+        for is_abs, regex in combined.items():
+            path = _normalize_path(os.path.abspath(file_path)) if is_abs else file_path
+            if regex.fullmatch(path):
+                matched.extend(index for index in groups[is_abs] if patterns[index].regex.fullmatch(path))
+        if matched:
+            yield file_path, tuple(sorted(matched))
+
+
+def _match_files(patterns: List[CompiledPattern], filenames: Optional[List[str]] = None) \
+        -> Iterator[Tuple[str, Replacer, Tuple[int, ...], Optional[Tuple[bytes, ...]], bool]]:
+    """Match files against all patterns.
+
+    A file matched by several patterns is reported once with a replacer and prescan
+    byte strings for the keys of all matching patterns, and the indents of those patterns.
+    orjson is not used for files whose replacement values it would write differently.
+
+    Args:
+        patterns: The compiled pattern configurations.
+        filenames: Paths of the files to consider, relative to the current directory.
+            If None, the tree below the patterns' base directories is walked instead.
+
+    Yields:
+        Tuples of the file path, the replacer to apply to it, the indents of its key
+        groups, the prescan byte strings, and whether orjson may be used to write it.
+    """
+    if filenames is None:
+        matches = _walk_patterns(patterns)
+    else:
+        matches = _match_filenames(patterns, filenames)
+
+    # Replacer, indents, prescan byte strings and orjson use for each combination of matching patterns
+    compiled: Dict[Tuple[int, ...], Tuple[Replacer, Tuple[int, ...], Optional[Tuple[bytes, ...]], bool]] = {}
+    for file_path, matched in matches:
+        if matched not in compiled:
+            groups = [patterns[index].keys for index in matched]
+            keys = [key for group in groups for key in group]
+            compiled[matched] = (compile_replacer(groups), tuple(patterns[index].indent for index in matched),
+                                 compile_prescan(keys), all(_orjson_safe(key[3]) for key in keys))
+        yield (file_path, *compiled[matched])
+
+
+def process_files(config: Dict[str, Any], direction: Union[Direction, str],
+                  filenames: Optional[List[str]] = None) -> int:
     """Process all files according to the configuration.
 
+    If there are several CPUs and more than a few files match, the matched files are
+    processed concurrently by a pool of threads while the tree is still being walked.
+    Their messages are printed at once before returning, in the order in which the
+    files were matched.
+    A file reached through several paths is counted once.
+
     Args:
         config: Configuration dictionary loaded from YAML.
-        direction: Direction of replacement, either 'to_committed' or 'to_working'.
+        direction: Direction of replacement, or its command line spelling.
+        filenames: Optional list of files to restrict processing to, e.g. the files
+            staged for commit. If None, all files matching the patterns are processed.
 
     Returns:
         Number of files that were modified.
     """
-    modified_files = 0
-
+    patterns: List[CompiledPattern] = []
     for pattern_config in config.get('patterns', []):
-        path_pattern = pattern_config['path']
-        keys = pattern_config['keys']
+        base, parts = _split_pattern(pattern_config['path'])
+        keys = compile_keys(pattern_config['keys'], direction)
         indent = pattern_config.get('indent', 2)
+        patterns.append(CompiledPattern(base, parts, _compile_glob(base, parts), keys, indent))
+
+    modified_files: Set[str] = set()
+    # Messages of each processed file, in the order the files were matched
+    messages: List[List[str]] = []
+    # Real path of each directory holding matched files, see _real_path
+    real_dirs: Dict[str, str] = {}
+    # Real path of each file in flight, and the file's latest job
+    pending: Dict['Future[bool]', str] = {}
+    in_flight: Dict[str, 'Future[bool]'] = {}
+    cpu_count = os.cpu_count() or 1
+    max_workers = min(32, cpu_count * 4)
+    executor: Optional[ThreadPoolExecutor] = None
+
+    def collect(done: Iterable['Future[bool]']) -> None:
+        for future in done:
+            real_path = pending.pop(future)
+            if in_flight.get(real_path) is future:
+                del in_flight[real_path]
+            if future.result():
+                modified_files.add(real_path)
 
-        for file_path in find_json_files(path_pattern):
-            if replace_in_json(file_path, keys, direction, indent):
-                modified_files += 1
-
-    return modified_files
+    try:
+        for count, (file_path, replacer, indents, prescan, use_orjson) in enumerate(_match_files(patterns, filenames)):
+            real_path = _real_path(file_path, real_dirs)
+            messages.append([])
+            args = (file_path, replacer, indents, prescan, use_orjson, messages[-1].append)
+            # Threads only pay for their overhead with several CPUs and enough files
+            if executor is None and cpu_count > 1 and count >= _SERIAL_FILES:
+                executor = ThreadPoolExecutor(max_workers=max_workers)
+            if executor is None:
+                if replace_in_json(*args):
+                    modified_files.add(real_path)
+                continue
+            # A file reached through several paths (symlinks, absolute and relative patterns)
+            # is processed once per path, but never by two threads at once, as the last write
+            # would discard the other's replacements
+            if real_path in in_flight:
+                collect(wait([in_flight[real_path]]).done)
+            # Keep only a bounded number of files in flight, so matching streams into the pool
+            if len(pending) >= 2 * max_workers:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            future = executor.submit(replace_in_json, *args)
+            pending[future] = real_path
+            in_flight[real_path] = future
+        collect(wait(pending).done)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    lines = [message for file_messages in messages for message in file_messages]
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+    return len(modified_files)
 
 
 def main() -> int:
@@ -160,7 +980,7 @@ def main() -> int:
     """
     args = parse_args()
     config = load_config(args.config)
-    modified_files = process_files(config, args.direction)
+    modified_files = process_files(config, args.direction, args.filenames or None)
     print(f"Modified {modified_files} files")
     return 0
 
@@ -6,6 +6,7 @@ setup(
     description="A pre-commit hook that replaces values for specified keys in JSON files",
     py_modules=["json_replace"],
     install_requires=[
+        "orjson>=3.6",
         "pyyaml>=6.0",
     ],
     entry_points={
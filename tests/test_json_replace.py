@@ -0,0 +1,479 @@
+import datetime
+import glob
+import json
+import os
+import sys
+
+import pytest
+
+import json_replace
+
+
+@pytest.mark.parametrize('value', [
+    1e16, -1.5e300, 1e-05, 1.5e-07, 0.0001, 0.1, 123.456, 2 ** 63 - 1, 0,
+    'plain', 'café', 'del \x7f', 'tab\t', '1e5', 'a: 1e5', '0.00001', '3f2e8b1c-9d4e-4a7b-8e5f-0c1d2e3f4a5b',
+    [], {}, None, True,
+])
+def test_dumps_matches_json(value):
+    for data in (value, {'value': value, 'nested': [value, {'value': value}]}):
+        for indent in (2, 4):
+            assert json_replace._dumps(data, indent) == json.dumps(data, indent=indent).encode('utf-8')
+
+
+def test_dumps_uses_orjson_for_strings_resembling_numbers(monkeypatch):
+    data = {'id': '3f2e8b1c-9d4e-4a7b-8e5f-0c1d2e3f4a5b', 'hash': '0e5d00000', 'list': ['1e5', '-0.00001']}
+    expected = json.dumps(data, indent=2).encode('utf-8')
+    monkeypatch.setattr(json, 'dumps', None)
+    assert json_replace._dumps(data, 2) == expected
+
+
+def test_dumps_keeps_non_finite_floats():
+    data, parsed_by_orjson = json_replace._loads(b'{"a": NaN, "b": Infinity}')
+    assert not parsed_by_orjson
+    assert json_replace._dumps(data, 2, parsed_by_orjson) == json.dumps(data, indent=2).encode('utf-8')
+
+
+@pytest.mark.parametrize('value', [float('inf'), float('nan'), {'a': [-float('inf')]}])
+def test_dumps_writes_non_finite_replacements_like_json(value):
+    assert not json_replace._orjson_safe(value)
+    data = {'a': value}
+    assert json_replace._dumps(data, 2, use_orjson=False) == json.dumps(data, indent=2).encode('utf-8')
+
+
+def test_dumps_rejects_dates_at_every_indent():
+    assert not json_replace._orjson_safe(datetime.date(2020, 1, 1))
+    for indent in (2, 4):
+        with pytest.raises(TypeError):
+            json_replace._dumps({'a': datetime.date(2020, 1, 1)}, indent, use_orjson=False)
+
+
+def test_non_finite_replacement_is_written_like_json(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '1.json').write_text('{"a": "dev"}')
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': float('inf')}]}]}
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED) == 1
+    assert (tmp_path / '1.json').read_text() == '{\n  "a": Infinity\n}'
+
+
+TREE = [
+    'config.json', '.hidden.json', 'notes.txt',
+    'a/1.json', 'a/.2.json', 'a/b/3.json', 'a/b/c/4.json', 'a/b/c/5.txt',
+    'a/.h/c/6.json', 'a/[x]/7.json',
+    'x/FooInputs/y/8.json', 'x/FooInputs/9.json', 'x/BarOutputs/10.json',
+    '.vscode/settings.json', '.git/objects/ab/11.json',
+    'node_modules/pkg/package.json', 'y/!/12.json', 'y/-/13.json', 'y/^/14.json', 'y/]/15.json', 'y/b/16.json',
+]
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    for path in TREE:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text('{}')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize('pattern', [
+    '**/*.json', '**', '*.json', '.*.json', '**/.*.json', 'config.json', 'missing.json',
+    'a/*.json', 'a/**/*.json', 'a/**', 'a/*/*.json', '*/*/*.json', 'a/**/c/*.json', 'a/.h/**/*.json',
+    '**/*Inputs/**/*.json', '**/*Outputs/*.json', '**/[!a]*/*.json', '**/?.json', 'a/[[]x]/*.json', 'a/[a-c&~|]/*.json',
+    './a/**/*.json', './/*.json', './/./a//*.json', '.vscode/settings.json', '**/.git/**/*.json',
+    'y/[!]]/*.json', 'y/[!]b]/*.json', 'a/./*.json', 'a//b/./c/*.json', 'a/./**/*.json', 'a/*/',
+])
+def test_find_json_files_matches_glob(tree, pattern):
+    expected = sorted(os.path.normpath(path) for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    assert sorted(os.path.normpath(path) for path in json_replace.find_json_files(pattern)) == expected
+
+
+@pytest.mark.parametrize('path, normalized', [
+    ('./a.json', 'a.json'), ('.//a.json', 'a.json'), ('././/./a/b.json', 'a/b.json'), ('.//*.json', '*.json'),
+    ('/a.json', '/a.json'), ('.a.json', '.a.json'), ('../a.json', '../a.json'), ('a/./b//c.json', 'a/b/c.json'),
+    ('a/./*.json', 'a/*.json'), ('a/.//**/.', 'a/**'), ('//a/../b/', '/a/../b/'), ('a/*/', 'a/*/'), ('.', ''),
+])
+def test_normalize_path_keeps_relative_paths_relative(path, normalized):
+    assert json_replace._normalize_path(path) == normalized
+
+
+def test_find_json_files_absolute_pattern(tree):
+    pattern = f'{tree.as_posix()}/a/**/*.json'
+    assert sorted(json_replace.find_json_files(pattern)) == sorted(glob.glob(pattern, recursive=True))
+
+
+def test_patterns_ignore_case_where_paths_do(tree, monkeypatch):
+    monkeypatch.setattr(json_replace, '_IGNORE_CASE', True)
+    monkeypatch.setattr(os.path, 'normcase', str.lower)
+    assert sorted(json_replace.find_json_files('**/*inputs/**/*.JSON')) == ['x/FooInputs/9.json',
+                                                                            'x/FooInputs/y/8.json']
+    assert list(json_replace.find_json_files('**/fooinputs/?.json')) == ['x/FooInputs/9.json']
+    assert _filenames(['**/*inputs/**/*.JSON'], ['x/FooInputs/9.json', 'x/BarOutputs/10.json']) \
+        == [('x/FooInputs/9.json', (0,))]
+
+
+@pytest.fixture
+def listed(monkeypatch):
+    directories = []
+    scandir = os.scandir
+
+    def recording_scandir(path='.'):
+        directories.append(os.path.normpath(path))
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', recording_scandir)
+    return directories
+
+
+def _walk(patterns):
+    compiled = [json_replace.CompiledPattern(*json_replace._split_pattern(pattern), None, [], 2)
+                for pattern in patterns]
+    return sorted(path for path, _ in json_replace._walk_patterns(compiled))
+
+
+def test_walk_only_enters_directories_a_pattern_can_match(tree, listed):
+    assert _walk(['config.json', 'a/**/*.json']) == ['a/1.json', 'a/[x]/7.json', 'a/b/3.json', 'a/b/c/4.json',
+                                                     'config.json']
+    assert not any(path.startswith(('node_modules', 'x')) for path in listed)
+
+
+def test_walk_limits_hidden_directories_per_pattern(tree, listed):
+    paths = _walk(['**/*.json', '.vscode/settings.json'])
+    assert '.vscode/settings.json' in paths
+    assert not any(path.startswith('.git') for path in listed)
+    assert not any('/.' in path for path in paths if not path.startswith('.vscode'))
+
+
+def test_walk_reports_each_file_once_with_all_matching_patterns(tree):
+    compiled = [json_replace.CompiledPattern(*json_replace._split_pattern(pattern), None, [], 2)
+                for pattern in ['**/*.json', 'a/b/*.json', 'a/**/3.json']]
+    matches = list(json_replace._walk_patterns(compiled))
+    assert len(matches) == len({path for path, _ in matches})
+    assert dict(matches)['a/b/3.json'] == (0, 1, 2)
+
+
+def _filenames(patterns, filenames):
+    compiled = []
+    for pattern in patterns:
+        base, parts = json_replace._split_pattern(pattern)
+        compiled.append(json_replace.CompiledPattern(base, parts, json_replace._compile_glob(base, parts), [], 2))
+    return list(json_replace._match_filenames(compiled, filenames))
+
+
+@pytest.mark.parametrize('patterns', [
+    ['**/*.json'], ['a/**/*.json', 'config.json'], ['**/*.json', '.vscode/settings.json'], ['a/.h/**/*.json'],
+    ['**/.*.json', '**/*Inputs/**/*.json'], ['a/./*.json', 'a//b/./c/*.json', 'x/./**/*.json'],
+])
+def test_match_filenames_agrees_with_the_walk(tree, patterns):
+    filenames = TREE + ['./' + path for path in TREE] + TREE
+    matches = _filenames(patterns, filenames)
+    assert len(matches) == len(dict(matches))
+    assert sorted(matches) == sorted(json_replace._walk_patterns(
+        [json_replace.CompiledPattern(*json_replace._split_pattern(p), None, [], 2) for p in patterns]))
+
+
+def test_process_files_only_touches_passed_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('a')
+    for path in ('a/1.json', 'a/2.json', 'a/3.txt'):
+        (tmp_path / path).write_text('{"a": "dev"}')
+    config = {'patterns': [{'path': 'a/*', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    filenames = ['./a/1.json', 'a/1.json', './/a/3.txt', 'b.json']
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED, filenames) == 2
+    assert json.loads((tmp_path / 'a/1.json').read_text()) == {'a': 'prod'}
+    assert json.loads((tmp_path / 'a/2.json').read_text()) == {'a': 'dev'}
+    assert json.loads((tmp_path / 'a/3.txt').read_text()) == {'a': 'prod'}
+
+
+def test_process_files_matches_passed_files_against_patterns_with_dot_components(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir('config')
+    (tmp_path / 'config/1.json').write_text('{"a": "dev"}')
+    config = {'patterns': [{'path': 'config/./*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED, ['config/1.json']) == 1
+    assert json.loads((tmp_path / 'config/1.json').read_text()) == {'a': 'prod'}
+
+
+@pytest.mark.parametrize('parallel', [True, False])
+@pytest.mark.parametrize('linked', [True, False])
+def test_process_files_applies_all_patterns_reaching_a_file_through_different_paths(tmp_path, monkeypatch, linked,
+                                                                                   parallel):
+    monkeypatch.chdir(tmp_path)
+    if parallel:
+        monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+        monkeypatch.setattr(json_replace, '_SERIAL_FILES', 0)
+    else:
+        monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+    os.mkdir('d')
+    if linked:
+        os.symlink('d', 'ld')
+        paths, staged = ['d/*.json', 'ld/*.json'], ['d/1.json', 'ld/1.json']
+    else:
+        paths, staged = [tmp_path.as_posix() + '/d/*.json', 'd/*.json'], ['d/1.json']
+    config = {'patterns': [{'path': path, 'keys': [{'key': key, 'working': 'dev', 'committed': 'prod'}]}
+                           for path, key in zip(paths, 'ab')]}
+    for filenames in (None, staged):
+        for _ in range(5):
+            (tmp_path / 'd/1.json').write_text('{"a": "dev", "b": "dev"}')
+            assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED, filenames) == 1
+            assert json.loads((tmp_path / 'd/1.json').read_text()) == {'a': 'prod', 'b': 'prod'}
+
+
+def test_process_files_processes_few_files_without_threads(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    monkeypatch.setattr(json_replace, 'ThreadPoolExecutor', None)
+    for i in range(json_replace._SERIAL_FILES):
+        (tmp_path / f'{i}.json').write_text('{"a": "dev"}')
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED) == json_replace._SERIAL_FILES
+
+
+def test_real_path_agrees_with_realpath(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('d/e')
+    (tmp_path / 'd/e/1.json').write_text('{}')
+    os.symlink('d', 'ld')
+    os.symlink('e/1.json', 'd/l.json')
+    real_dirs = {}
+    for path in ['d/e/1.json', 'ld/e/1.json', 'd/l.json', 'ld/l.json', 'd/../d/e/1.json', 'x.json', 'ld/x.json']:
+        assert json_replace._real_path(path, real_dirs) == os.path.normcase(os.path.realpath(path))
+    assert real_dirs['ld'] == os.path.realpath('d')
+
+
+def test_match_filenames_matches_absolute_patterns_like_the_walk(tree):
+    pattern = os.getcwd().replace(os.sep, '/') + '/a/**/*.json'
+    assert _filenames([pattern], ['a/1.json', './a/b/3.json', 'x/BarOutputs/10.json', 'a/.h/c/6.json']) \
+        == [('a/1.json', (0,)), ('a/b/3.json', (0,))]
+    assert _walk([pattern]) == [os.getcwd().replace(os.sep, '/') + '/' + path
+                                for path in ['a/1.json', 'a/[x]/7.json', 'a/b/3.json', 'a/b/c/4.json']]
+    assert _filenames(['*.json', pattern], ['a/1.json', 'config.json']) == [('a/1.json', (1,)), ('config.json', (0,))]
+
+
+def test_load_config_ignores_cache_after_same_size_edit(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text('files: [a]\n')
+    st = os.stat(config_path)
+    assert json_replace.load_config(str(config_path)) == {'files': ['a']}
+
+    config_path.write_text('files: [b]\n')
+    os.utime(config_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert json_replace.load_config(str(config_path)) == {'files': ['b']}
+    assert len(os.listdir(tmp_path / 'cache' / 'json-replace')) == 1
+
+
+def _replacer(*groups):
+    return json_replace.compile_replacer([json_replace.compile_keys(keys, json_replace.Direction.TO_COMMITTED)
+                                          for keys in groups])
+
+
+def test_replacer_replaces_only_matching_values():
+    replace = _replacer([{'key': 'a.b', 'working': 'dev', 'committed': 'prod'},
+                         {'key': 'c', 'working': 1, 'committed': 2},
+                         {'key': 'd.e', 'working': 'dev', 'committed': 'prod'}])
+    data = {'a': {'b': 'dev'}, 'c': 3, 'd': ['e']}
+    assert replace(data) == 0
+    assert data == {'a': {'b': 'prod'}, 'c': 3, 'd': ['e']}
+    assert replace(data) is None
+
+
+def test_replacer_reports_last_group_that_replaced_a_value():
+    replace = _replacer([{'key': 'a', 'working': 'dev', 'committed': 'prod'}],
+                        [{'key': 'b', 'working': 'dev', 'committed': 'prod'}])
+    assert replace({'a': 'dev', 'b': 'dev'}) == 1
+    assert replace({'a': 'dev', 'b': 'prod'}) == 0
+    assert replace({'a': 'prod', 'b': 'dev'}) == 1
+
+
+def test_replacer_handles_deep_key_paths():
+    parts = [f'k{i}' for i in range(200)]
+    replace = _replacer([{'key': '.'.join(parts), 'working': 'dev', 'committed': 'prod'}])
+    data = leaf = {}
+    for part in parts[:-1]:
+        leaf[part] = leaf = {}
+    leaf[parts[-1]] = 'dev'
+    assert replace(data) == 0
+    assert leaf[parts[-1]] == 'prod'
+
+
+def test_overlapping_patterns_keep_the_indent_of_the_last_one_that_replaced(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('x')
+    for path, c in (('1.json', 'dev'), ('x/2.json', 'dev'), ('x/3.json', 'prod')):
+        with open(path, 'w') as f:
+            json.dump({'a': {'b': 'dev'}, 'c': c}, f)
+    config = {'patterns': [
+        {'path': '**/*.json', 'keys': [{'key': 'a.b', 'working': 'dev', 'committed': 'prod'}]},
+        {'path': 'x/**/*.json', 'indent': 4, 'keys': [{'key': 'c', 'working': 'dev', 'committed': 'prod'}]},
+    ]}
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED) == 3
+    for path, c, indent in (('1.json', 'dev', 2), ('x/2.json', 'prod', 4), ('x/3.json', 'prod', 2)):
+        with open(path) as f:
+            assert f.read() == json.dumps({'a': {'b': 'prod'}, 'c': c}, indent=indent)
+
+
+def test_messages_are_printed_by_process_files_and_replace_in_json(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '1.json').write_text('{"a": "dev"}')
+    (tmp_path / '2.json').write_text('{"a": "dev",}')
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED) == 1
+    assert capsys.readouterr().out == 'Modified: 1.json\nError: 2.json is not a valid JSON file\n'
+
+    replacer = json_replace.compile_replacer([[]])
+    assert not json_replace.replace_in_json('2.json', replacer)
+    assert capsys.readouterr().out == 'Error: 2.json is not a valid JSON file\n'
+
+
+def test_process_files_prints_messages_in_match_order(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    names = [f'{i:03}.json' for i in range(200)]
+    for name in names:
+        (tmp_path / name).write_text('{"a": "dev"}')
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED, names) == 200
+    assert capsys.readouterr().out == ''.join(f'Modified: {name}\n' for name in names)
+
+
+def _replace_with_prescan(path, keys):
+    compiled = json_replace.compile_keys(keys, json_replace.Direction.TO_COMMITTED)
+    prescan = json_replace.compile_prescan(compiled)
+    assert prescan is not None
+    return json_replace.replace_in_json(str(path), json_replace.compile_replacer([compiled]), (2,), prescan)
+
+
+@pytest.mark.parametrize('contents', [
+    b'{"url": "http:\\/\\/dev"}', b'{"url": "\\u0068ttp://dev"}', b'{"url": "http://d\\u0065v"}',
+])
+def test_prescan_keeps_files_with_escaped_values(tmp_path, contents):
+    path = tmp_path / '1.json'
+    path.write_bytes(contents)
+    assert _replace_with_prescan(path, [{'key': 'url', 'working': 'http://dev', 'committed': 'http://prod'}])
+    assert json.loads(path.read_bytes()) == {'url': 'http://prod'}
+
+
+@pytest.mark.parametrize('ensure_ascii', [True, False])
+def test_prescan_keeps_files_with_non_ascii_values(tmp_path, ensure_ascii):
+    path = tmp_path / '1.json'
+    path.write_bytes(json.dumps({'name': 'café ☕'}, ensure_ascii=ensure_ascii).encode('utf-8'))
+    assert _replace_with_prescan(path, [{'key': 'name', 'working': 'café ☕', 'committed': 'bar'}])
+    assert json.loads(path.read_bytes()) == {'name': 'bar'}
+
+
+def test_prescan_skips_files_without_expected_values(tmp_path, capsys):
+    path = tmp_path / '1.json'
+    path.write_bytes(b'{"name": "prod", not json')
+    assert not _replace_with_prescan(path, [{'key': 'name', 'working': 'dev', 'committed': 'prod'}])
+    assert capsys.readouterr().out == ''
+
+
+@pytest.mark.parametrize('working', [1, 1.5, True, None, ['dev']])
+def test_prescan_is_disabled_for_values_other_than_strings(working):
+    keys = [{'key': 'a', 'working': 'dev', 'committed': 'prod'}, {'key': 'b', 'working': working, 'committed': 2}]
+    assert json_replace.compile_prescan(json_replace.compile_keys(keys, json_replace.Direction.TO_COMMITTED)) is None
+
+
+def _write_replacing(path, contents, committed='prod'):
+    path.write_bytes(contents)
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': committed}]}]}
+    return json_replace.process_files(config, json_replace.Direction.TO_COMMITTED)
+
+
+def test_process_files_keeps_mode_and_symlinks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir('real')
+    os.symlink(os.path.join('real', '1.json'), 'link.json')
+    (tmp_path / 'real' / '1.json').write_bytes(b'{"a": "dev"}')
+    os.chmod(tmp_path / 'real' / '1.json', 0o640)
+    assert _write_replacing(tmp_path / '2.json', b'{"a": "dev"}') == 2
+    assert os.path.islink('link.json')
+    assert (tmp_path / 'real' / '1.json').read_bytes() == b'{\n  "a": "prod"\n}'
+    assert os.stat(tmp_path / 'real' / '1.json').st_mode & 0o777 == 0o640
+    assert (tmp_path / '2.json').read_bytes() == b'{\n  "a": "prod"\n}'
+    assert sorted(os.listdir(tmp_path)) == ['2.json', 'link.json', 'real']
+    assert os.listdir(tmp_path / 'real') == ['1.json']
+
+
+def test_process_files_skips_byte_identical_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / '1.json'
+    path.write_bytes(b'{\n  "a": "dev"\n}')
+    st = os.stat(path)
+    assert _write_replacing(path, b'{\n  "a": "dev"\n}', committed='dev') == 0
+    assert os.stat(path).st_ino == st.st_ino
+    assert _write_replacing(path, b'{"a": "dev"}', committed='dev') == 1
+    assert path.read_bytes() == b'{\n  "a": "dev"\n}'
+
+
+def test_process_files_writes_platform_line_endings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(os, 'linesep', '\r\n')
+    path = tmp_path / '1.json'
+    assert _write_replacing(path, b'{"a": "dev"}') == 1
+    assert path.read_bytes() == b'{\r\n  "a": "prod"\r\n}'
+    assert _write_replacing(path, b'{\r\n  "a": "dev"\r\n}', committed='dev') == 0
+
+
+def test_process_files_memory_maps_large_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    read = []
+    read_contents = json_replace._read_contents
+
+    def recording_read_contents(file_path, size):
+        raw = read_contents(file_path, size)
+        read.append(type(raw))
+        return raw
+
+    monkeypatch.setattr(json_replace, '_read_contents', recording_read_contents)
+    pad = 'x' * json_replace._MMAP_THRESHOLD
+    (tmp_path / '1.json').write_text(json.dumps({'a': 'dev', 'pad': pad}))
+    (tmp_path / '2.json').write_text(json.dumps({'a': 'dev', 'pad': pad, 'b': float('nan')}))
+    (tmp_path / '3.json').write_text(json.dumps({'a': 'prod', 'pad': pad}))
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED) == 2
+    assert read == [json_replace.mmap.mmap] * 3
+    assert (tmp_path / '1.json').read_text() == json.dumps({'a': 'prod', 'pad': pad}, indent=2)
+    assert (tmp_path / '2.json').read_text() == json.dumps({'a': 'prod', 'pad': pad, 'b': float('nan')}, indent=2)
+
+    st = os.stat(tmp_path / '1.json')
+    config['patterns'][0]['keys'][0]['working'] = 'prod'
+    assert json_replace.process_files(config, json_replace.Direction.TO_COMMITTED) == 1
+    assert os.stat(tmp_path / '1.json').st_ino == st.st_ino
+    assert (tmp_path / '3.json').read_text() == json.dumps({'a': 'prod', 'pad': pad}, indent=2)
+    assert sorted(os.listdir(tmp_path)) == ['1.json', '2.json', '3.json']
+
+
+@pytest.mark.parametrize('value, direction', [
+    ('to_committed', json_replace.Direction.TO_COMMITTED), ('to_working', json_replace.Direction.TO_WORKING),
+])
+def test_parse_args_parses_direction(monkeypatch, value, direction):
+    monkeypatch.setattr(sys, 'argv', ['json_replace.py', '--direction', value, '--config', 'c.yaml', '1.json'])
+    args = json_replace.parse_args()
+    assert args.direction is direction
+    assert (args.config, args.filenames) == ('c.yaml', ['1.json'])
+
+
+def test_parse_args_rejects_unknown_direction(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['json_replace.py', '--help'])
+    with pytest.raises(SystemExit):
+        json_replace.parse_args()
+    assert '--direction {to_committed,to_working}' in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, 'argv', ['json_replace.py', '--direction', 'to_staged', '--config', 'c.yaml'])
+    with pytest.raises(SystemExit) as exc_info:
+        json_replace.parse_args()
+    assert exc_info.value.code == 2
+    assert "invalid direction: 'to_staged'" in capsys.readouterr().err
+
+
+def test_process_files_rejects_unknown_direction_with_value_error():
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    with pytest.raises(ValueError, match="invalid direction: 'bogus'"):
+        json_replace.process_files(config, 'bogus')
+
+
+def test_process_files_accepts_direction_spelling(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '1.json').write_text('{"a": "prod"}')
+    config = {'patterns': [{'path': '*.json', 'keys': [{'key': 'a', 'working': 'dev', 'committed': 'prod'}]}]}
+    assert json_replace.process_files(config, 'to_working') == 1
+    assert json.loads((tmp_path / '1.json').read_text()) == {'a': 'dev'}